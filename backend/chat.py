@@ -7,24 +7,24 @@ via the system prompt, so the assistant can answer with real-time context.
 from __future__ import annotations
 
 import os
-import csv
 import logging
-from typing import List, Dict
+from typing import AsyncIterator, List, Dict
 
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from dotenv import load_dotenv
 
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
 
 # ──────────────────────── Project Imports ────────────────────────
+from config import require_openai_key
 from data import get_sensor_readings
+from openai_client import shared_httpx
+from shared_state import get_detected_classes_cached
 
 # ──────────────────────── Environment Setup ────────────────────────
-load_dotenv()
-if not os.getenv("OPENAI_API_KEY"):
-    raise RuntimeError("OPENAI_API_KEY is missing in .env")
+require_openai_key()
 
 MODEL_NAME = "gpt-4o-mini"
 TEMPERATURE = 0.0
@@ -32,7 +32,8 @@ TEMPERATURE = 0.0
 llm = ChatOpenAI(
     model_name=MODEL_NAME,
     temperature=TEMPERATURE,
-    streaming=False
+    streaming=True,
+    http_async_client=shared_httpx,
 )
 
 # ──────────────────────── Pydantic Models ────────────────────────
@@ -47,11 +48,66 @@ class ChatResp(BaseModel):
 # ──────────────────────── FastAPI Router ────────────────────────
 router = APIRouter(tags=["chat"])
 
+# Appended to a /chat/stream body when the model stream fails partway
+STREAM_ERROR_MARKER = "\n[[stream-error]]"
+
 # ──────────────────────── YOLO Detection Setup ────────────────────────
 current_dir = os.path.dirname(os.path.abspath(__file__))
 YOLO_DIR = os.path.join(current_dir, "yolo")
 DETECTION_CSV = os.path.join(current_dir, "static", "detected_photo", "detected_classes.csv")
 
+# ──────────────────────── System Prompt ────────────────────────
+# Static text is concatenated once at import; only the sensor and
+# detection blocks are filled in per request. They are kept last, but the
+# static part is only ~350 tokens, well under OpenAI's 1024-token minimum
+# for prompt caching, so no cache hit is expected at this size.
+_SYSTEM_PROMPT_TMPL = (
+    "# Strawberry Plant Growth & Health Assistant\n\n"
+    "## Role:\n"
+    "You are an AI assistant designed to provide insights about the growth stages and health status of strawberry plants "
+    "based on object detection results. Your role is to communicate findings clearly and offer care suggestions where appropriate. "
+    "You operate alongside an automated growbox system that manages environmental variables like light, humidity, and irrigation.\n\n"
+
+    "## Input Classes You May Receive:\n"
+    "- Healthy Leaf\n"
+    "- Flower\n"
+    "- Unripe Strawberry\n"
+    "- Ripe Strawberry\n"
+    "- Powdery Mildew Fruit\n"
+    "- Gray Mold\n\n"
+
+    "## Growth Stage Logic:\n"
+    "**Stage 1 – Vegetative Phase**: Only leaves detected.\n"
+    "**Stage 2 – Flowering Phase**: Flowers detected (with/without fruit).\n"
+    "**Stage 3 – Fruit Development Phase**: Unripe strawberries detected.\n"
+    "**Stage 4 – Fruit Maturity or Stress Phase**: Ripe/diseased fruits present.\n\n"
+
+    "⚠️ Presence of ripe/diseased fruit alone means Stage 4.\n\n"
+
+    "## Responsibilities:\n"
+    "- Identify growth stage\n"
+    "- Explain detected classes\n"
+    "- Give care suggestions (excluding auto-controlled parameters)\n\n"
+
+    "## Knowledge Base:\n"
+    "- Powdery Mildew: white spots in humid areas\n"
+    "- Gray Mold: fuzzy mold on ripe fruit\n"
+    "- Stages follow natural development: leaf → flower → fruit → ripe\n"
+    "- Sanitation reduces disease risk\n"
+    "- Presence of fruit = past flowering\n\n"
+
+    "## Communication Style:\n"
+    "- Informative and accessible\n"
+    "- Always grounded in detections\n"
+    "- No speculation unless prompted\n\n"
+
+    "## Current Sensor Readings:\n"
+    "{sensor_context}\n\n"
+
+    "## Latest Detections:\n"
+    "{detected}\n"
+)
+
 # ──────────────────────── Helper Functions ────────────────────────
 def _sensor_context() -> str:
     """Return a formatted line of current sensor values."""
@@ -64,17 +120,35 @@ def _sensor_context() -> str:
 
 def get_detected_classes() -> List[str]:
     """Read detected classes from the YOLO CSV output."""
-    detected_classes = []
     try:
-        if os.path.exists(DETECTION_CSV):
-            with open(DETECTION_CSV, 'r') as csvfile:
-                reader = csv.reader(csvfile)
-                for row in reader:
-                    if row and row[0].strip():
-                        detected_classes.append(row[0].strip())
+        return get_detected_classes_cached(DETECTION_CSV) or []
     except Exception as e:
         logging.error(f"Error reading detected classes from CSV: {e}")
-    return detected_classes
+        return []
+
+def _build_messages(req: ChatReq) -> list:
+    """Compose the system prompt, trimmed history and the new user turn."""
+    # Get current YOLO detection and sensor data
+    detected_classes = get_detected_classes()
+    sensor_context = _sensor_context()
+
+    # Compose system message
+    system_msg = SystemMessage(
+        content=_SYSTEM_PROMPT_TMPL.format(
+            sensor_context=sensor_context,
+            detected=", ".join(detected_classes) or "No features detected",
+        )
+    )
+
+    # Limit history to last 20 turns
+    history = (req.history or [])[-20:]
+    lc_history = [
+        HumanMessage(content=m["content"]) if m["role"] == "user"
+        else AIMessage(content=m["content"])
+        for m in history
+    ]
+    lc_history.append(HumanMessage(content=req.message))
+    return [system_msg, *lc_history]
 
 # ──────────────────────── Main Chat Endpoint ────────────────────────
 @router.post("/chat", response_model=ChatResp)
@@ -84,76 +158,15 @@ async def chat(req: ChatReq) -> ChatResp:
     real-time sensor data, and YOLO detection results.
     """
     try:
-        # Get current YOLO detection and sensor data
-        detected_classes = get_detected_classes()
-        sensor_context = _sensor_context()
-
-        # Compose system message
-        system_msg = SystemMessage(
-            content=(
-                "# Strawberry Plant Growth & Health Assistant\n\n"
-                "## Role:\n"
-                "You are an AI assistant designed to provide insights about the growth stages and health status of strawberry plants "
-                "based on object detection results. Your role is to communicate findings clearly and offer care suggestions where appropriate. "
-                "You operate alongside an automated growbox system that manages environmental variables like light, humidity, and irrigation.\n\n"
-
-                "## Input Classes You May Receive:\n"
-                "- Healthy Leaf\n"
-                "- Flower\n"
-                "- Unripe Strawberry\n"
-                "- Ripe Strawberry\n"
-                "- Powdery Mildew Fruit\n"
-                "- Gray Mold\n\n"
-
-                "## Growth Stage Logic:\n"
-                "**Stage 1 – Vegetative Phase**: Only leaves detected.\n"
-                "**Stage 2 – Flowering Phase**: Flowers detected (with/without fruit).\n"
-                "**Stage 3 – Fruit Development Phase**: Unripe strawberries detected.\n"
-                "**Stage 4 – Fruit Maturity or Stress Phase**: Ripe/diseased fruits present.\n\n"
-
-                "⚠️ Presence of ripe/diseased fruit alone means Stage 4.\n\n"
-
-                "## Responsibilities:\n"
-                "- Identify growth stage\n"
-                "- Explain detected classes\n"
-                "- Give care suggestions (excluding auto-controlled parameters)\n\n"
-
-                "## Knowledge Base:\n"
-                "- Powdery Mildew: white spots in humid areas\n"
-                "- Gray Mold: fuzzy mold on ripe fruit\n"
-                "- Stages follow natural development: leaf → flower → fruit → ripe\n"
-                "- Sanitation reduces disease risk\n"
-                "- Presence of fruit = past flowering\n\n"
-
-                "## Communication Style:\n"
-                "- Informative and accessible\n"
-                "- Always grounded in detections\n"
-                "- No speculation unless prompted\n\n"
-
-                "## Current Sensor Readings:\n"
-                f"{sensor_context}\n\n"
-
-                "## Latest Detections:\n"
-                f"{', '.join(detected_classes) if detected_classes else 'No features detected'}\n"
-            )
-        )
-
-        # Limit history to last 20 turns
-        history = (req.history or [])[-20:]
-        lc_history = [
-            HumanMessage(content=m["content"]) if m["role"] == "user"
-            else AIMessage(content=m["content"])
-            for m in history
-        ]
-        lc_history.append(HumanMessage(content=req.message))
+        messages = _build_messages(req)
 
         # Run model
-        ai_msg: AIMessage = await llm.ainvoke([system_msg, *lc_history])
+        ai_msg: AIMessage = await llm.ainvoke(messages)
         assistant_reply = ai_msg.content.strip()
 
         # Return with updated history
         new_history = [
-            *history,
+            *(req.history or [])[-20:],
             {"role": "user", "content": req.message},
             {"role": "assistant", "content": assistant_reply},
         ]
@@ -163,3 +176,28 @@ async def chat(req: ChatReq) -> ChatResp:
     except Exception as exc:
         logging.exception("LangChain / OpenAI call failed")
         raise HTTPException(status_code=500, detail=f"LLM error: {exc}")
+
+@router.post("/chat/stream")
+async def chat_stream(req: ChatReq) -> StreamingResponse:
+    """
+    Same as /chat, but streams the reply as plain-text chunks
+    as soon as the model produces them. A reply cut short by an error
+    ends with STREAM_ERROR_MARKER.
+    """
+    try:
+        messages = _build_messages(req)
+    except Exception as exc:
+        logging.exception("Failed to build chat prompt")
+        raise HTTPException(status_code=500, detail=f"LLM error: {exc}")
+
+    async def _deltas() -> AsyncIterator[str]:
+        try:
+            async for chunk in llm.astream(messages):
+                if chunk.content:
+                    yield chunk.content
+        except Exception:
+            # Headers are already sent; flag the reply as incomplete instead
+            logging.exception("LangChain / OpenAI stream failed")
+            yield STREAM_ERROR_MARKER
+
+    return StreamingResponse(_deltas(), media_type="text/plain; charset=utf-8")
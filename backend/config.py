@@ -0,0 +1,30 @@
+"""
+Central configuration for the Growbox backend.
+Reads .env once and exposes the settings every module needs.
+"""
+
+import os
+from functools import lru_cache
+from types import SimpleNamespace
+
+from dotenv import load_dotenv
+
+@lru_cache
+def settings() -> SimpleNamespace:
+    """Load .env (first call only) and return the resolved settings."""
+    load_dotenv()
+    return SimpleNamespace(
+        openai_key=os.getenv("OPENAI_API_KEY"),
+        fan_ip=os.getenv("FAN_IP"),
+        light_ip=os.getenv("LIGHT_IP"),
+        sensor_ttl=float(os.getenv("SENSOR_TTL", "0.25")),       # seconds
+        sensor_jit=os.getenv("SENSOR_JIT", "1") != "0",
+        llm_check_every=int(os.getenv("LLM_CHECK_EVERY", "0")),  # 0 = no periodic LLM cross-check
+    )
+
+def require_openai_key() -> str:
+    """Return the OpenAI API key, raising if it is not configured."""
+    key = settings().openai_key
+    if not key:
+        raise RuntimeError("OPENAI_API_KEY is missing in .env")
+    return key
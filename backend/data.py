@@ -6,27 +6,47 @@ Reads analog values from MCP3008 via SPI for:
 - Soil Moisture
 """
 
-import spidev
 import time
+import threading
+
+import spidev
+
+from config import settings
 
 # ─────────────────────────── SPI Setup ───────────────────────────
 spi = spidev.SpiDev()
 spi.open(0, 0)  # Bus 0, CE0
 spi.max_speed_hz = 1_350_000
 
+# ──────────────────────── Snapshot Cache ────────────────────────
+# HTTP, chat and the control loop all poll the sensors; share one
+# snapshot for a short window instead of hitting the SPI bus each time.
+SENSOR_TTL = settings().sensor_ttl  # seconds
+
+_cache = {"t": 0, "v": None}
+_cache_lock = threading.Lock()
+
 # ──────────────────────── Low-Level Read Utils ────────────────────────
+# Single-ended MCP3008 command frames, built once instead of per read.
+# Each conversion needs its own CS cycle: with CS held low the chip just
+# shifts the previous result out LSB-first, so frames can't be chained
+# into one transfer.
+_CMD_FRAMES = tuple((1, (8 + ch) << 4, 0) for ch in range(8))
+
 def _read_channel(channel: int) -> int:
     """Read raw ADC value (0–1023) from given MCP3008 channel."""
-    adc = spi.xfer2([1, (8 + channel) << 4, 0])
-    return ((adc[1] & 3) << 8) + adc[2]
+    adc = spi.xfer2(_CMD_FRAMES[channel])
+    return ((adc[1] & 3) << 8) | adc[2]
+
+# ADC → unit factors, folded once: 3.3 V reference, 10 mV/°C for LM35
+_LM35_SCALE = 3.3 * 100.0 / 1023.0
+_PCT_SCALE = 100.0 / 1023.0
 
 def _lm35_celsius(raw: int) -> float:
     """Convert raw LM35 value to degrees Celsius."""
-    voltage = (raw * 3.3) / 1023
-    return voltage * 100.0  # 10 mV/°C for LM35
+    return raw * _LM35_SCALE
 
-# ──────────────────────── Public Interface ────────────────────────
-def get_sensor_readings() -> dict:
+def _read_sensors() -> dict:
     """
     Read all sensor channels and return values in a structured dictionary.
     """
@@ -35,7 +55,7 @@ def get_sensor_readings() -> dict:
     soil_raw  = _read_channel(2)
 
     temperature_c = _lm35_celsius(lm35_raw)
-    mq135_pct     = round(mq135_raw / 1023 * 100, 1)
+    mq135_pct     = round(mq135_raw * _PCT_SCALE, 1)
 
     # Uncomment below lines for debug output
     # print("-" * 40)
@@ -52,6 +72,19 @@ def get_sensor_readings() -> dict:
         "timestamp": int(time.time())
     }
 
+# ──────────────────────── Public Interface ────────────────────────
+def get_sensor_readings() -> dict:
+    """
+    Return the latest sensor snapshot, re-reading the ADC only when the
+    cached one is older than SENSOR_TTL seconds.
+    """
+    with _cache_lock:
+        now = time.monotonic_ns()
+        if _cache["v"] is None or now - _cache["t"] >= SENSOR_TTL * 1e9:
+            _cache["v"] = _read_sensors()
+            _cache["t"] = now
+        return _cache["v"].copy()  # callers may add keys (e.g. current_time)
+
 # ──────────────────────── CLI Test Hook ────────────────────────
 if __name__ == "__main__":
     try:
@@ -1,35 +1,39 @@
 """
 Growbox automation core logic.
-Uses LangChain + GPT to decide actuator states (fan, light, pump)
-based on live sensor data.
+Decides actuator states (fan, light, pump) from live sensor data using
+the deterministic rules below, falling back to LangChain + GPT when the
+readings look implausible.
 """
 
-import os
 import time
 import json
+import math
 import logging
-import datetime
-import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict
 
-from dotenv import load_dotenv
+import orjson
 from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.messages import HumanMessage, SystemMessage
 
+from config import require_openai_key, settings
 from tasmota import cmd as tas_cmd
-from shared_state import manual_lock, last_decision
+from shared_state import (
+    active_manual_lock, bg_pool, get_last_decision, log_job_failure, run_on_loop,
+    set_decision, update_decision,
+)
+from openai_client import shared_httpx
 from data import get_sensor_readings
-from pump import blink_led
+from pump import blink_led, pump_busy
 
 # ───────────────────────────── 1) Environment & LLM ─────────────────────────────
-load_dotenv()
-if "OPENAI_API_KEY" not in os.environ:
-    raise RuntimeError("OPENAI_API_KEY is missing in .env!")
+require_openai_key()
 
 llm = ChatOpenAI(
     model="gpt-4o-mini",
     temperature=0,
     model_kwargs={"response_format": {"type": "json_object"}},
+    http_async_client=shared_httpx,
 )
 
 # ───────────────────────────── 2) System Prompt ─────────────────────────────
@@ -62,80 +66,157 @@ No extra keys, no units, no comments.
 Plant safety is your top priority.
 """
 
-# ───────────────────────────── 3) Prompt Template ─────────────────────────────
-prompt = ChatPromptTemplate.from_messages([
-    ("system", SYSTEM_PROMPT),
-    ("human", "Readings:\n{readings_json}")
-])
+# ───────────────────────────── 3) Prompt Messages ─────────────────────────────
+# The system message never changes; only the readings message is built per call.
+_SYS_MSG = SystemMessage(content=SYSTEM_PROMPT)
+
+# ───────────────────────────── 4) Rule-Based Decision ─────────────────────────────
+# Same thresholds as RULES in SYSTEM_PROMPT; keep the two in sync.
+SOIL_DRY_RAW = 400
+FAN_TEMP_C = 30
+FAN_GAS_PCT = 60
+LIGHT_WINDOW = ("06:00", "22:00")
+LIGHT_MAX_TEMP_C = 35
+
+# Every Nth tick, compare the rules with the LLM and log mismatches (0 = off)
+LLM_CHECK_EVERY = settings().llm_check_every
+_tick = 0
+
+def _readings_plausible(readings: Dict) -> bool:
+    """Return True if all readings are present and the temperature is believable."""
+    temp = readings.get("temperature_c")
+    gas = readings.get("mq135_pct")
+    soil = readings.get("soil_raw")
+    if not all(isinstance(v, (int, float)) for v in (temp, gas, soil)):
+        return False
+    # Gas and soil come straight off the 10-bit ADC, so their ranges are fixed
+    # by construction; only the LM35 temperature (0-330 °C span) can be
+    # implausible, e.g. a floating or shorted sensor.
+    return math.isfinite(temp) and -10 <= temp <= 80
+
+def _rule_based_decision(readings: Dict) -> Dict[str, str]:
+    """Apply the RULES from the system prompt directly."""
+    temp = readings["temperature_c"]
+    start, end = LIGHT_WINDOW
+    return {
+        "fan": "on" if temp > FAN_TEMP_C or readings["mq135_pct"] > FAN_GAS_PCT else "off",
+        "light": "on" if start <= readings["current_time"] < end and temp <= LIGHT_MAX_TEMP_C else "off",
+        "pump": "on" if readings["soil_raw"] < SOIL_DRY_RAW else "off",
+    }
+
+def _llm_decision(readings: Dict) -> Dict[str, str] | None:
+    """Ask the LLM for a decision; returns None if the reply is unusable."""
+    messages = [
+        _SYS_MSG,
+        HumanMessage(content=f"Readings:\n{orjson.dumps(readings).decode()}"),
+    ]
+    # Called from the control-loop thread; the shared client lives on the app loop
+    response = run_on_loop(llm.ainvoke(messages))
+
+    try:
+        decision = json.loads(response.content)
+    except json.JSONDecodeError:
+        logging.warning("LLM JSON parse error: %s", response.content)
+        return None
 
-# ───────────────────────────── 4) Pump Trigger Thread ─────────────────────────────
+    if not all(k in decision for k in ("fan", "light", "pump")):
+        logging.warning("Missing keys in decision: %s", decision)
+        return None
+    return decision
+
+# ───────────────────────────── 5) Pump Trigger ─────────────────────────────
 PUMP_DURATION = 2  # seconds
 
 def _run_pump(duration: int = PUMP_DURATION) -> None:
     """Trigger the pump (via GPIO17) and update shared state."""
-    last_decision["pump"] = "on"
-    blink_led(duration=duration)
-    last_decision["pump"] = "off"
-
-# ───────────────────────────── 5) Core Logic ─────────────────────────────
+    try:
+        if not blink_led(duration=duration, on_change=lambda s: set_decision("pump", s)):
+            logging.info("Pump already running; skipping control-loop run")
+    except Exception:
+        set_decision("pump", "off")  # else the loop thinks it's still watering
+        raise
+
+# Fan and light are separate devices; command them in parallel so a slow
+# or unreachable one doesn't hold up the other.
+_tasmota_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="tasmota")
+
+# Local "HH:MM", recomputed only when the minute rolls over
+_hm_cache = [-1, ""]
+
+def _local_hhmm() -> str:
+    """Return the current local time as "HH:MM"."""
+    minute = int(time.time() // 60)
+    if _hm_cache[0] != minute:
+        _hm_cache[:] = [minute, time.strftime("%H:%M", time.localtime())]
+    return _hm_cache[1]
+
+# ───────────────────────────── 6) Core Logic ─────────────────────────────
 def decide_actuators(readings: Dict) -> Dict[str, str]:
     """
-    Send sensor readings to the LLM and get ON/OFF decisions.
+    Turn sensor readings into ON/OFF decisions (rules first, LLM on anomalies).
     Applies manual locks and executes hardware actions.
     """
-    # Add current time to readings
-    now_dt = datetime.datetime.now(datetime.timezone.utc).astimezone()
-    readings["current_time"] = now_dt.strftime("%H:%M")
-
-    # Compose and send prompt
-    messages = prompt.format_messages(
-        readings_json=json.dumps(readings, ensure_ascii=False)
-    )
-    response = llm.invoke(messages)
-
-    try:
-        decision = json.loads(response.content)
-    except json.JSONDecodeError:
-        logging.warning("LLM JSON parse error: %s", response.content)
-        return last_decision
+    global _tick
 
-    if not all(k in decision for k in ("fan", "light", "pump")):
-        logging.warning("Missing keys in decision: %s", decision)
-        return last_decision
+    # Add current time to readings
+    readings["current_time"] = _local_hhmm()
+
+    _tick += 1
+    if _readings_plausible(readings):
+        decision = _rule_based_decision(readings)
+
+        # Periodic sanity check: compare with the LLM, but keep acting on the rules
+        if LLM_CHECK_EVERY > 0 and _tick % LLM_CHECK_EVERY == 0:
+            llm_decision = _llm_decision(readings)
+            if llm_decision is not None and any(
+                llm_decision[k] != decision[k] for k in ("fan", "light", "pump")
+            ):
+                logging.warning(
+                    "LLM disagrees with rules: llm=%s rules=%s readings=%s",
+                    llm_decision, decision, readings,
+                )
+    else:
+        decision = _llm_decision(readings)
+        if decision is None:
+            return get_last_decision()
 
     final_decision = decision.copy()
     now = time.time()
 
     # ─── Fan & Light: Controlled via Tasmota ─────
+    pending = []
     for dev in ("fan", "light"):
-        locked_state, expiry = manual_lock.get(dev, (None, 0))
-        if locked_state and now < expiry:
+        locked_state = active_manual_lock(dev, now)
+        if locked_state:
             final_decision[dev] = locked_state  # Respect manual override
             continue
 
-        tas_cmd(dev, "On" if decision[dev] == "on" else "Off")
+        pending.append(
+            _tasmota_pool.submit(tas_cmd, dev, "On" if decision[dev] == "on" else "Off")
+        )
 
-        if dev in manual_lock and now >= expiry:
-            manual_lock.pop(dev, None)
+    for fut in pending:
+        fut.result()
 
     # ─── Pump: GPIO control ─────
-    if decision["pump"] == "on" and last_decision.get("pump") != "on":
-        threading.Thread(target=_run_pump, daemon=True).start()
+    if decision["pump"] == "on" and get_last_decision()["pump"] != "on" and not pump_busy():
+        bg_pool.submit(_run_pump).add_done_callback(log_job_failure)
         final_decision["pump"] = "on"
     elif decision["pump"] == "off":
         final_decision["pump"] = "off"
 
-    # Save and return
-    last_decision.update(final_decision)
+    # Save and return (pump state is reported by the pump run itself, so a
+    # failed or skipped run can't leave "on" behind)
+    update_decision({k: v for k, v in final_decision.items() if k != "pump"})
     return final_decision
 
-# ───────────────────────────── 6) Continuous Loop ─────────────────────────────
+# ───────────────────────────── 7) Continuous Loop ─────────────────────────────
 def run_control_loop(interval: int = 60):
     """
     Repeats forever:
     • read sensors
-    • send to LLM
-    • act based on returned decisions
+    • decide (rules, or LLM on anomalies)
+    • act based on the decisions
     """
     logging.info("Growbox control loop started (interval = %ss)", interval)
     while True:
@@ -11,17 +11,23 @@ import threading
 import time
 from contextlib import asynccontextmanager
 
+import orjson
 from fastapi import Body, FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 
-from shared_state import last_decision, manual_lock
+from shared_state import (
+    bg_pool, bind_loop, get_last_decision, log_job_failure, release_manual_lock,
+    set_decision, set_manual_lock, state_changed,
+)
 from tasmota import cmd as tas_cmd
 from data import get_sensor_readings
 from llm import run_control_loop
 from chat import router as chat_router
-from yolo_integration import router as yolo_router
-from pump import blink_led  # GPIO water-pump helper
+from yolo_integration import router as yolo_router, run_yolo_periodically
+from pump import blink_led_async, pump_busy  # GPIO water-pump helper
+from openai_client import shared_httpx
 
 # ─────────────────────── YOLO Path Setup ───────────────────────
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -38,6 +44,9 @@ async def lifespan(app: FastAPI):
         handlers=[logging.StreamHandler()],
     )
 
+    # Let worker threads wake WebSocket listeners on state changes
+    bind_loop(asyncio.get_running_loop())
+
     # LLM decision control loop
     def _llm_worker():
         run_control_loop(interval=10)
@@ -46,33 +55,17 @@ async def lifespan(app: FastAPI):
     logging.info("LLM control loop thread started.")
 
     # YOLO detection pipeline loop
-    def _yolo_worker():
-        try:
-            logging.info("Starting YOLO pipeline...")
-            os.chdir(yolo_dir)
-            from yolo.model_pipeline import run_pipeline, CHECK_INTERVAL
-            import schedule
-
-            run_pipeline()  # initial detection
-            schedule.every(CHECK_INTERVAL).minutes.do(run_pipeline)
-            logging.info(f"YOLO scheduled every {CHECK_INTERVAL} minutes.")
-
-            while True:
-                schedule.run_pending()
-                time.sleep(1)
-
-        except Exception as e:
-            logging.error(f"YOLO pipeline error: {e}")
-        finally:
-            os.chdir(current_dir)
-
-    threading.Thread(target=_yolo_worker, daemon=True).start()
-    logging.info("YOLO pipeline thread started.")
+    yolo_task = asyncio.create_task(run_yolo_periodically())
+    logging.info("YOLO pipeline task started.")
 
-    yield  # Lifespan context end
+    try:
+        yield  # Lifespan context end
+    finally:
+        yolo_task.cancel()
+        await shared_httpx.aclose()
 
 # ─────────────────────── FastAPI App Setup ───────────────────────
-app = FastAPI(title="Growbox API", lifespan=lifespan)
+app = FastAPI(title="Growbox API", lifespan=lifespan, default_response_class=ORJSONResponse)
 app.include_router(chat_router)
 app.include_router(yolo_router)
 
@@ -82,12 +75,59 @@ os.makedirs(static_dir, exist_ok=True)
 app.mount("/static", StaticFiles(directory=static_dir), name="static")
 
 # ─────────────────────── Helper: Auto Release ───────────────────────
-def _auto_release(dev: str, desired: str, minutes: int):
-    """Automatically release a manual lock after specified duration."""
-    time.sleep(minutes * 60)
+# Pending auto-release timer per device; replaced whenever a new lock is set
+_release_timers: dict[str, asyncio.TimerHandle] = {}
+
+def _auto_release(dev: str, desired: str, lock: tuple):
+    """Release a manual lock once its duration has passed, unless it was replaced."""
+    if not release_manual_lock(dev, expected=lock):
+        return
     tas_cmd(dev, desired.capitalize())
-    manual_lock.pop(dev, None)
-    last_decision[dev] = desired
+    set_decision(dev, desired)
+
+def _schedule_auto_release(dev: str, desired: str, lock: tuple, minutes: int):
+    """Arm the release timer for `dev`, cancelling any earlier one."""
+    old = _release_timers.pop(dev, None)
+    if old is not None:
+        old.cancel()
+    if minutes <= 0:
+        return
+
+    def _fire():
+        _release_timers.pop(dev, None)
+        bg_pool.submit(_auto_release, dev, desired, lock).add_done_callback(log_job_failure)
+
+    _release_timers[dev] = asyncio.get_running_loop().call_later(minutes * 60, _fire)
+
+# ─────────────────────── Water Pump Control ───────────────────────
+# Registered before /actuators/{dev}/{action}, which would otherwise match it
+_pump_task: asyncio.Task | None = None  # current manual run, if any
+
+@app.post("/actuators/pump/on")
+async def water_pump(payload: dict | None = Body(None)):
+    """
+    Start the water pump for a specified duration in seconds.
+    Rejected while another pump run is still in progress.
+    """
+    global _pump_task
+    seconds = int(payload.get("duration", 5)) if payload else 2
+
+    if pump_busy() or (_pump_task is not None and not _pump_task.done()):
+        return {"error": "pump is already running"}
+
+    async def _run():
+        try:
+            ran = await blink_led_async(
+                duration=seconds, on_change=lambda s: set_decision("pump", s)
+            )
+            if not ran:
+                logging.info("Pump already running; manual run skipped")
+        except Exception as e:
+            logging.exception("Pump failure: %s", e)
+            set_decision("pump", "off")
+
+    _pump_task = asyncio.create_task(_run())
+    return {"status": "watering", "duration": seconds}
 
 # ─────────────────────── Fan / Light Control ───────────────────────
 @app.post("/actuators/{dev}/{action}")
@@ -101,6 +141,9 @@ async def toggle_device(
     action  : on | off | toggle
     duration: how long to keep state (0 = indefinitely)
     """
+    if dev not in ("fan", "light"):
+        return {"error": "dev must be fan/light"}
+
     action = action.lower()
     if action not in ("on", "off", "toggle"):
         return {"error": "action must be on/off/toggle"}
@@ -110,42 +153,15 @@ async def toggle_device(
 
     result = tas_cmd(dev, power_cmd)
 
-    if dev in ("fan", "light"):
-        state = "on" if power_cmd == "On" else "off"
-        last_decision[dev] = state
-
-        expiry = float("inf") if duration == 0 else time.time() + duration * 60
-        manual_lock[dev] = (state, expiry)
+    state = "on" if power_cmd == "On" else "off"
+    set_decision(dev, state)
 
-        if duration > 0:
-            threading.Thread(
-                target=_auto_release,
-                args=(dev, "off" if state == "on" else "on", duration),
-                daemon=True
-            ).start()
+    expiry = float("inf") if duration == 0 else time.time() + duration * 60
+    set_manual_lock(dev, state, expiry)
+    _schedule_auto_release(dev, "off" if state == "on" else "on", (state, expiry), duration)
 
     return result
 
-# ─────────────────────── Water Pump Control ───────────────────────
-@app.post("/actuators/pump/on")
-async def water_pump(payload: dict | None = Body(None)):
-    """
-    Start the water pump for a specified duration in seconds.
-    """
-    seconds = int(payload.get("duration", 5)) if payload else 2
-
-    def _run():
-        try:
-            last_decision["pump"] = "on"
-            blink_led(duration=seconds)
-        except Exception as e:
-            logging.exception("Pump failure: %s", e)
-        finally:
-            last_decision["pump"] = "off"
-
-    threading.Thread(target=_run, daemon=True).start()
-    return {"status": "watering", "duration": seconds}
-
 # ─────────────────────── CORS Configuration ───────────────────────
 origins = [
     "http://localhost:5173",
@@ -164,7 +180,7 @@ app.add_middleware(
 @app.get("/actuators")
 async def read_actuators():
     """Return the last known actuator states."""
-    return last_decision
+    return get_last_decision()
 
 @app.get("/sensor")
 async def read_sensor():
@@ -179,11 +195,12 @@ async def ws_actuators(websocket: WebSocket):
     last_sent = None
     try:
         while True:
-            state = last_decision.copy()
+            changed = state_changed()
+            state = get_last_decision()
             if state != last_sent:
-                await websocket.send_json(state)
+                await websocket.send_text(orjson.dumps(state).decode())
                 last_sent = state
-            await asyncio.sleep(0.2)
+            await changed.wait()
     except WebSocketDisconnect:
         pass
 
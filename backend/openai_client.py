@@ -0,0 +1,16 @@
+"""
+Shared async HTTP transport for the OpenAI-backed LangChain models.
+Chat and the control-loop fallback reuse one HTTP/2 connection pool
+instead of each opening their own.
+"""
+
+import httpx
+
+# ───────────────────────────── Shared Client ─────────────────────────────
+# Bound to the FastAPI event loop: only await requests on that loop
+# (worker threads go through shared_state.run_on_loop).
+shared_httpx = httpx.AsyncClient(
+    http2=True,
+    limits=httpx.Limits(max_connections=4, max_keepalive_connections=4),
+    timeout=30.0,
+)
@@ -3,9 +3,81 @@ from gpiozero import Device, LED
 from gpiozero.pins.lgpio import LGPIOFactory     # <-- add
 Device.pin_factory = LGPIOFactory()              # <-- add
 
+import asyncio
+import threading
 from time import sleep
-def blink_led(pin: int = 17, duration: int = 2):
-    led = LED(pin, active_high=False)            # LOW-active relay
-    led.on()
-    sleep(duration)
-    led.off()
+
+# Claimed once at import; re-creating the LED per trigger reopens the chip
+_pump_pin = 17
+_pump_led = LED(_pump_pin, active_high=False)    # LOW-active relay
+
+# Held for the whole of a pump run (or a pin swap) so runs never overlap
+_relay_lock = threading.Lock()
+
+def _select_pin(pin: int | None) -> None:
+    """Swap the relay to `pin` (None = keep current); caller must hold _relay_lock."""
+    global _pump_pin, _pump_led
+    if pin is None or pin == _pump_pin:
+        return
+    _pump_led.close()
+    _pump_pin = pin
+    _pump_led = LED(pin, active_high=False)
+
+def init(pin: int) -> bool:
+    """
+    Move the pump relay to another GPIO pin for all later runs.
+    Never blocks (safe on the event loop): returns False if a run is active.
+    """
+    if not _relay_lock.acquire(blocking=False):
+        return False
+    try:
+        _select_pin(pin)
+    finally:
+        _relay_lock.release()
+    return True
+
+def pump_busy() -> bool:
+    """Return True while a pump run is in progress."""
+    return _relay_lock.locked()
+
+def blink_led(pin: int | None = None, duration: int = 2, on_change=None) -> bool:
+    """
+    Run the pump for `duration` seconds, calling on_change("on"/"off") around it.
+    `pin` switches the relay pin first; by default the current one is used.
+    Returns False without touching the relay if another run is active.
+    """
+    if not _relay_lock.acquire(blocking=False):
+        return False
+    try:
+        _select_pin(pin)
+        _pump_led.on()
+        if on_change:
+            on_change("on")
+        try:
+            sleep(duration)
+        finally:
+            _pump_led.off()
+            if on_change:
+                on_change("off")
+    finally:
+        _relay_lock.release()
+    return True
+
+async def blink_led_async(pin: int | None = None, duration: int = 2, on_change=None) -> bool:
+    """Same as blink_led, but waits with asyncio.sleep instead of blocking."""
+    if not _relay_lock.acquire(blocking=False):
+        return False
+    try:
+        _select_pin(pin)
+        _pump_led.on()
+        if on_change:
+            on_change("on")
+        try:
+            await asyncio.sleep(duration)
+        finally:
+            _pump_led.off()
+            if on_change:
+                on_change("off")
+    finally:
+        _relay_lock.release()
+    return True
@@ -0,0 +1,76 @@
+"""
+Batched sensor sampling for Growbox project.
+Collects many MCP3008 samples into numpy arrays, e.g. for trendlines.
+Kept apart from data.py so the regular sensor path doesn't import numpy.
+"""
+
+import time
+
+import numpy as np
+
+from config import settings
+from data import spi, _CMD_FRAMES, _LM35_SCALE, _PCT_SCALE
+
+# ──────────────────────── Block Decoding ────────────────────────
+# Numba is optional (requirements-optional.txt) and only imported on the
+# first decode. Set SENSOR_JIT=0 to skip it, e.g. on a Pi Zero where
+# the first compile takes longer than it saves.
+def _decode_kernel(buf, out_raw):
+    for i in range(buf.shape[0] // 3):
+        out_raw[i] = ((buf[i * 3 + 1] & 3) << 8) | buf[i * 3 + 2]
+
+_jit = {"checked": False, "fn": None}
+
+def _jit_decoder():
+    """Return the compiled kernel, or None if Numba is disabled or missing."""
+    if not _jit["checked"]:
+        _jit["checked"] = True
+        if settings().sensor_jit:
+            try:
+                from numba import njit
+            except ImportError:
+                pass
+            else:
+                _jit["fn"] = njit(cache=True, fastmath=True)(_decode_kernel)
+    return _jit["fn"]
+
+def decode_adc_block(buf: np.ndarray, out_raw: np.ndarray) -> None:
+    """
+    Decode consecutive 3-byte MCP3008 responses in `buf` (uint8) into
+    10-bit values in `out_raw` (int16), one per response.
+    """
+    decode = _jit_decoder()
+    if decode is not None:
+        decode(buf, out_raw)
+        return
+    frames = buf[: buf.shape[0] // 3 * 3].reshape(-1, 3)
+    out_raw[: frames.shape[0]] = ((frames[:, 1] & 3).astype(np.int16) << 8) | frames[:, 2]
+
+# ──────────────────────── Public Interface ────────────────────────
+def get_sensor_block(n_samples: int) -> dict:
+    """
+    Read `n_samples` back-to-back samples of all three channels and return
+    them as arrays (bypasses the snapshot cache).
+
+    Acquisition still costs one Python-level spi.xfer2 per frame (the MCP3008
+    needs a CS cycle per conversion), and that dominates the per-sample time;
+    the JIT only speeds up the decode/convert step that follows.
+    """
+    buf = np.empty(n_samples * 9, dtype=np.uint8)
+    for i in range(n_samples):
+        for ch in range(3):
+            off = i * 9 + ch * 3
+            buf[off:off + 3] = spi.xfer2(_CMD_FRAMES[ch])  # one CS cycle per frame
+
+    raw = np.empty(n_samples * 3, dtype=np.int16)
+    decode_adc_block(buf, raw)
+    raw = raw.reshape(n_samples, 3)
+
+    return {
+        "lm35_raw": raw[:, 0],
+        "mq135_raw": raw[:, 1],
+        "soil_raw": raw[:, 2],
+        "temperature_c": raw[:, 0].astype(np.float32) * np.float32(_LM35_SCALE),
+        "mq135_pct": raw[:, 1].astype(np.float32) * np.float32(_PCT_SCALE),
+        "timestamp": int(time.time()),
+    }
@@ -1,8 +1,14 @@
 """
-Shared in-memory state for actuator decisions and manual overrides.
-Used by both the control loop and API endpoints.
+Shared in-memory state for actuator decisions, manual overrides and
+the latest YOLO detections. Used by both the control loop and API endpoints.
 """
 
+import os
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 # Tracks the last known state of each actuator
 last_decision = {
     "fan": "off",
@@ -13,8 +19,135 @@ last_decision = {
 # Tracks manual locks on actuators: { "fan": ("on", expiry_timestamp), ... }
 manual_lock = {}
 
+# Guards last_decision and manual_lock, which worker threads and the event loop share
+_state_lock = threading.Lock()
+
+# Bounded pool for short blocking jobs (pump runs, auto-release commands)
+bg_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="gb")
+
+# Serializes YOLO runs, which chdir into the YOLO directory (CWD is process-wide)
+yolo_lock = threading.Lock()
+
+# Parsed YOLO detections, reused until the CSV's mtime or size changes
+_det_cache = {"key": None, "classes": []}
+
+# Event loop that owns the change notifications (bound at app startup)
+_loop: asyncio.AbstractEventLoop | None = None
+
+# Set (and replaced) every time last_decision changes
+_state_changed = asyncio.Event()
+
 def get_last_decision() -> dict:
     """
     Returns a copy of the current actuator state dictionary.
     """
-    return last_decision.copy()
+    with _state_lock:
+        return last_decision.copy()
+
+def set_decision(dev: str, state: str) -> None:
+    """Record a single actuator state and notify listeners."""
+    with _state_lock:
+        last_decision[dev] = state
+    notify()
+
+def update_decision(states: dict) -> None:
+    """Record several actuator states at once and notify listeners."""
+    with _state_lock:
+        last_decision.update(states)
+    notify()
+
+def set_manual_lock(dev: str, state: str, expiry: float) -> None:
+    """Hold `dev` in `state` until the `expiry` timestamp."""
+    with _state_lock:
+        manual_lock[dev] = (state, expiry)
+
+def release_manual_lock(dev: str, expected: tuple | None = None) -> bool:
+    """
+    Drop the manual lock on `dev`. If `expected` is given, only drop it while
+    it is still that exact (state, expiry) lock. Returns True if released.
+    """
+    with _state_lock:
+        if expected is not None and manual_lock.get(dev) != expected:
+            return False
+        manual_lock.pop(dev, None)
+        return True
+
+def active_manual_lock(dev: str, now: float) -> str | None:
+    """
+    Return the locked state for `dev` if its lock is still active.
+    Expired locks are removed in the same step.
+    """
+    with _state_lock:
+        locked_state, expiry = manual_lock.get(dev, (None, 0))
+        if locked_state and now < expiry:
+            return locked_state
+        manual_lock.pop(dev, None)
+        return None
+
+def log_job_failure(fut) -> None:
+    """Done-callback for fire-and-forget bg_pool jobs: log any exception."""
+    exc = fut.exception()
+    if exc is not None:
+        logging.error("Background job failed", exc_info=exc)
+
+def bind_loop(loop: asyncio.AbstractEventLoop) -> None:
+    """Register the FastAPI event loop so worker threads can notify it."""
+    global _loop
+    _loop = loop
+
+def state_changed() -> asyncio.Event:
+    """
+    Return the event that fires on the next state change.
+    Grab it *before* reading the state so no update can slip in between.
+    """
+    return _state_changed
+
+def _fire() -> None:
+    """Wake all current waiters and arm a fresh event for the next change."""
+    global _state_changed
+    fired, _state_changed = _state_changed, asyncio.Event()
+    fired.set()
+
+def notify() -> None:
+    """Signal that last_decision changed. Safe to call from any thread."""
+    if _loop is None or _loop.is_closed():
+        return
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is _loop:
+        _fire()
+    else:
+        _loop.call_soon_threadsafe(_fire)
+
+def get_detected_classes_cached(path: str) -> list[str] | None:
+    """
+    Return the class names (first CSV column) from the YOLO detections file,
+    re-parsing only when its mtime or size changes. Returns None if the file is missing.
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    # Size too: mtime granularity is coarse, so a read racing the YOLO writer
+    # could otherwise cache a partial list under the final mtime
+    key = (path, st.st_mtime_ns, st.st_size)
+
+    if key != _det_cache["key"]:
+        with open(path, "rb") as f:
+            data = f.read()
+        _det_cache["classes"] = [
+            name.decode("utf-8", "replace")
+            for name in (row.split(b",", 1)[0].strip() for row in data.splitlines())
+            if name
+        ]
+        _det_cache["key"] = key
+    return list(_det_cache["classes"])
+
+def run_on_loop(coro):
+    """Run a coroutine on the bound event loop from a worker thread and wait for it."""
+    if _loop is None or _loop.is_closed():
+        coro.close()
+        raise RuntimeError("No event loop bound; call bind_loop() at startup")
+    return asyncio.run_coroutine_threadsafe(coro, _loop).result()
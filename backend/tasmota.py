@@ -3,19 +3,32 @@ Tasmota HTTP API controller for smart actuators (fan, light).
 Sends power commands via HTTP to preconfigured Tasmota devices.
 """
 
-import os
 import requests
-from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-# Load environment variables from .env
-load_dotenv()
+from config import settings
 
 # IP addresses for Tasmota-controlled devices
+_s = settings()
 IP = {
-    "fan": os.getenv("FAN_IP"),
-    "light": os.getenv("LIGHT_IP")
+    "fan": _s.fan_ip,
+    "light": _s.light_ip
 }
 
+# Shared keep-alive session so repeated commands reuse the TCP connection
+SESSION = requests.Session()
+SESSION.mount(
+    "http://",
+    HTTPAdapter(
+        pool_connections=2,
+        pool_maxsize=4,
+        # Only retry failed connects: commands like Power Toggle aren't
+        # idempotent, so a read timeout must not resend them
+        max_retries=Retry(total=1, connect=1, read=False, status=False, backoff_factor=0.1),
+    ),
+)
+
 def cmd(dev: str, power_cmd: str) -> dict:
     """
     Send a power command to the specified Tasmota device.
@@ -36,7 +49,7 @@ def cmd(dev: str, power_cmd: str) -> dict:
     url = f"http://{IP[dev]}/cm?cmnd=Power{sep}{power_cmd}"
 
     try:
-        r = requests.get(url, timeout=4)
+        r = SESSION.get(url, timeout=4)
     except requests.RequestException as exc:
         return {"error": str(exc)}
 
@@ -5,11 +5,14 @@ Provides endpoints for image capture, latest image retrieval, and class detectio
 
 import os
 import sys
+import asyncio
+import logging
 import shutil
-import schedule
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import FileResponse
 
+from shared_state import get_detected_classes_cached, yolo_lock
+
 # ─────────────────────── YOLO & Static Path Setup ───────────────────────
 current_dir = os.path.dirname(os.path.abspath(__file__))
 yolo_dir = os.path.join(current_dir, "yolo")  # YOLO is inside backend now
@@ -22,6 +25,52 @@ DETECTION_CSV = os.path.join(YOLO_OUTPUT_DIR, "detected_classes.csv")
 
 os.makedirs(YOLO_OUTPUT_DIR, exist_ok=True)
 
+# ───────────────────────────── Periodic Pipeline ─────────────────────────────
+_next_fire_at = 0.0  # event-loop time of the next scheduled run
+
+def _run_pipeline():
+    """Run one YOLO detection pass from inside the YOLO directory."""
+    with yolo_lock:
+        os.chdir(yolo_dir)
+        try:
+            from yolo.model_pipeline import run_pipeline
+            run_pipeline()
+        finally:
+            os.chdir(current_dir)
+
+def _reschedule(loop: asyncio.AbstractEventLoop) -> None:
+    """Push the next periodic run a full CHECK_INTERVAL into the future."""
+    global _next_fire_at
+    from yolo.model_pipeline import CHECK_INTERVAL
+    _next_fire_at = loop.time() + CHECK_INTERVAL * 60
+
+async def run_yolo_periodically():
+    """
+    Run the pipeline once, then every CHECK_INTERVAL minutes.
+    The pipeline itself runs in the default executor to keep the loop free.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        logging.info("Starting YOLO pipeline...")
+        await loop.run_in_executor(None, _run_pipeline)  # initial detection
+        _reschedule(loop)
+        from yolo.model_pipeline import CHECK_INTERVAL
+        logging.info(f"YOLO scheduled every {CHECK_INTERVAL} minutes.")
+    except Exception as e:
+        logging.error(f"YOLO pipeline error: {e}")
+        return
+
+    while True:
+        delay = _next_fire_at - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)  # re-checked: /capture-image may move it
+            continue
+        _reschedule(loop)
+        try:
+            await loop.run_in_executor(None, _run_pipeline)
+        except Exception as e:
+            logging.error(f"YOLO pipeline error: {e}")
+
 # ───────────────────────────── FastAPI Router ─────────────────────────────
 router = APIRouter(prefix="/yolo", tags=["yolo"])
 
@@ -31,16 +80,12 @@ async def capture_image():
     Manually trigger the YOLO detection pipeline and refresh the scheduler.
     """
     try:
-        schedule.clear()  # clear existing job
-
         # Run pipeline manually
-        os.chdir(yolo_dir)
-        from yolo.model_pipeline import run_pipeline, CHECK_INTERVAL
-        run_pipeline()
-        os.chdir(current_dir)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, _run_pipeline)
 
-        # Reschedule future executions
-        schedule.every(CHECK_INTERVAL).minutes.do(run_pipeline)
+        # Restart the periodic countdown from now
+        _reschedule(loop)
 
         if os.path.exists(DETECTION_IMAGE):
             return {"status": "success", "message": "Image captured and analyzed successfully."}
@@ -65,9 +110,8 @@ async def get_detected_classes():
     """
     Read the last detected class list from the CSV file.
     """
-    if os.path.exists(DETECTION_CSV):
-        with open(DETECTION_CSV, "r") as f:
-            classes = [line.strip() for line in f if line.strip()]
+    classes = get_detected_classes_cached(DETECTION_CSV)
+    if classes is not None:
         return {"classes": classes}
     else:
         raise HTTPException(status_code=404, detail="No class data found.")
@@ -35,6 +35,9 @@ interface ActuatorState {
 /* ------------------------------------------------------------------ */
 /* 2) Initial placeholders                                             */
 /* ------------------------------------------------------------------ */
+// Sent by /chat/stream when the model fails partway through a reply
+const STREAM_ERROR_MARKER = '\n[[stream-error]]';
+
 const initialSensorData = {
   temperature: 0,
   airquality: 0,
@@ -50,7 +53,7 @@ function App() {
   const [isLightOn, setIsLightOn] = useState(false);
   const [isChatOpen, setIsChatOpen] = useState(false);
   const [messages, setMessages] =
-    useState<{ text: string; isUser: boolean }[]>([]);
+    useState<{ text: string; isUser: boolean; interrupted?: boolean }[]>([]);
   const [inputMessage, setInputMessage] = useState('');
   const [isUpdating, setIsUpdating] = useState(false);
   const [isCapturingImage, setIsCapturingImage] = useState(false);
@@ -139,9 +142,9 @@ const handleSendMessage = async (e: React.FormEvent) => {
   setMessages(prev => [...prev, { text: trimmed, isUser: true }]);
   setInputMessage('');
 
-  // ➋ API çağrısı
+  // ➋ API çağrısı (streamed reply)
   try {
-    const res = await fetch(`${baseURL}/chat`, {
+    const res = await fetch(`${baseURL}/chat/stream`, {
       method: 'POST',
       headers: { 'Content-Type': 'application/json' },
       body: JSON.stringify({
@@ -152,11 +155,35 @@ const handleSendMessage = async (e: React.FormEvent) => {
         })),
       }),
     });
-    if (!res.ok) throw new Error(`HTTP ${res.status}`);
-    const data = await res.json() as { reply: string; history: any[] };
-
-    // ➌ Cevabı ekle
-    setMessages(prev => [...prev, { text: data.reply, isUser: false }]);
+    if (!res.ok || !res.body) throw new Error(`HTTP ${res.status}`);
+
+    // ➌ Cevabı ekle, then grow it as chunks arrive
+    setMessages(prev => [...prev, { text: '', isUser: false }]);
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let reply = '';
+    for (;;) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      reply += decoder.decode(value, { stream: true });
+      const text = reply.split(STREAM_ERROR_MARKER)[0];
+      setMessages(prev => [...prev.slice(0, -1), { text, isUser: false }]);
+    }
+    const failed = reply.includes(STREAM_ERROR_MARKER);
+    const text = reply.split(STREAM_ERROR_MARKER)[0];
+    if (!text.trim()) {
+      setMessages(prev => prev.slice(0, -1));  // drop the empty bubble
+      throw new Error(failed ? 'Stream failed' : 'Empty reply');
+    }
+    if (failed) {
+      // Keep the partial answer; the notice is rendered from the flag so it
+      // never ends up in the history sent back to the model
+      setMessages(prev => [...prev.slice(0, -1), {
+        text,
+        isUser: false,
+        interrupted: true,
+      }]);
+    }
   } catch (err) {
     console.error('Chat failed:', err);
     setMessages(prev => [...prev, {
@@ -394,6 +421,11 @@ const handleSendMessage = async (e: React.FormEvent) => {
                       }`}
                     >
                       {message.text}
+                      {message.interrupted && (
+                        <p className="mt-2 text-sm text-amber-700">
+                          ⚠️ Reply interrupted – the AI service stopped responding.
+                        </p>
+                      )}
                     </div>
                   </div>
                 ))}